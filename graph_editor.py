@@ -1,8 +1,13 @@
 import tkinter as tk
 from tkinter import ttk, colorchooser, simpledialog, filedialog
+from tkinter import font as tkfont
 import networkx as nx
-import math
-from utils import calculate_arrow_points, point_distance
+from concurrent.futures import ThreadPoolExecutor
+from utils import point_distance
+from scene import Scene, layout_edges, target_distances
+from layout_metrics import LayoutMetrics
+from relaxation import relax_positions, sweep_layouts
+from image_export import draw_items, record_relaxation
 from PIL import Image, ImageDraw
 
 import random
@@ -22,6 +27,23 @@ class GraphEditor(tk.Frame):
         self.default_node_color = "white"
         self.default_edge_color = "black"
         
+        # Edge geometry and label placement; the canvas measures text with Tk,
+        # the exporters draw with PIL fonts and so place labels with PIL metrics
+        self._tk_fonts = {}
+        self.scene = Scene(self._measure_text, self.node_radius)
+        self.export_scene = Scene(node_radius=self.node_radius)
+        
+        # Layout quality, refreshed incrementally on every redraw
+        self.layout_metrics = LayoutMetrics()
+        self._metrics_edges = None
+        self._dragging = False # Full stress pass waits for the drag to end
+        
+        # Best-of-N layout sweep settings
+        self.sweep_alphas = (0.3, 0.5, 0.8)
+        self.sweep_iterations = (50, 100, 200)
+        self.sweep_metric = "stress"
+        self._sweep_executor = ThreadPoolExecutor(max_workers=1) # Keeps the pool run off the Tk thread
+        
         self.pixels_per_unit = None # Will be set on first edge
         
         self.create_widgets()
@@ -113,6 +135,9 @@ class GraphEditor(tk.Frame):
         self.btn_layout = tk.Button(self.toolbar, text="Auto Layout", command=self.auto_layout)
         self.btn_layout.pack(side=tk.LEFT, padx=2, pady=5)
         
+        self.btn_best_layout = tk.Button(self.toolbar, text="Best-of-N Layout", command=self.best_of_n_layout)
+        self.btn_best_layout.pack(side=tk.LEFT, padx=2, pady=5)
+        
         # Additional Shapes
         self.btn_text = tk.Button(self.toolbar, text="+ Text", command=lambda: self.set_mode("ADD_SHAPE_TEXT"))
         self.btn_text.pack(side=tk.LEFT, padx=2, pady=5)
@@ -134,11 +159,24 @@ class GraphEditor(tk.Frame):
         self.mb_templates.menu.add_command(label="USA Topology", command=lambda: self.load_template("usa"))
         self.mb_templates.pack(side=tk.LEFT, padx=2, pady=5)
         
+        # Edge View Menu
+        self.mb_edge_view = tk.Menubutton(self.toolbar, text="Edge View", relief=tk.RAISED)
+        self.mb_edge_view.menu = tk.Menu(self.mb_edge_view, tearoff=0)
+        self.mb_edge_view["menu"] = self.mb_edge_view.menu
+        self.mb_edge_view.menu.add_command(label="Directed", command=lambda: self.set_edge_view("DIRECTED"))
+        self.mb_edge_view.menu.add_command(label="Undirected", command=lambda: self.set_edge_view("UNDIRECTED"))
+        self.mb_edge_view.menu.add_command(label="Bidirectional (Double Arrows)", command=lambda: self.set_edge_view("BIDIRECTIONAL"))
+        self.mb_edge_view.menu.add_command(label="Parallel Curves", command=lambda: self.set_edge_view("PARALLEL"))
+        self.mb_edge_view.pack(side=tk.LEFT, padx=2, pady=5)
+        
         self.btn_clear = tk.Button(self.toolbar, text="Clear", command=self.clear_graph)
         self.btn_clear.pack(side=tk.LEFT, padx=2, pady=5)
 
         self.btn_export = tk.Button(self.toolbar, text="Export PNG", command=self.export_png)
         self.btn_export.pack(side=tk.RIGHT, padx=5, pady=5)
+        
+        self.btn_export_animation = tk.Button(self.toolbar, text="Export Animation", command=self.export_animation)
+        self.btn_export_animation.pack(side=tk.RIGHT, padx=5, pady=5)
 
         # Properties Panel (Sidebar)
         self.properties_panel = tk.Frame(self, bg="#f0f0f0", width=200)
@@ -157,6 +195,11 @@ class GraphEditor(tk.Frame):
         
         self.btn_delete = tk.Button(self.properties_panel, text="Delete", command=self.delete_item, state=tk.DISABLED, bg="#ffcccc")
         self.btn_delete.pack(pady=20)
+        
+        tk.Label(self.properties_panel, text="Layout Quality", font=("Arial", 10, "bold")).pack(pady=5)
+        
+        self.lbl_metrics = tk.Label(self.properties_panel, text="", justify=tk.LEFT)
+        self.lbl_metrics.pack(pady=5)
 
         # Canvas
         self.canvas = tk.Canvas(self, bg="white")
@@ -172,6 +215,19 @@ class GraphEditor(tk.Frame):
         self.mode = mode
         print(f"Mode set to: {mode}")
         
+    def set_edge_view(self, edge_view):
+        self.scene.edge_view = edge_view
+        self.export_scene.edge_view = edge_view
+        print(f"Edge view set to: {edge_view}")
+        self.draw_graph()
+        
+    def _measure_text(self, text, font):
+        tk_font = self._tk_fonts.get(font)
+        if tk_font is None:
+            tk_font = tkfont.Font(font=font)
+            self._tk_fonts[font] = tk_font
+        return (tk_font.measure(text), tk_font.metrics("linespace"))
+
     def clear_graph(self):
         self.graph.clear()
         self.pos.clear()
@@ -212,13 +268,16 @@ class GraphEditor(tk.Frame):
 
     def on_canvas_drag(self, event):
         if self.mode == "MOVE" and self.selected_node is not None:
+            self._dragging = True
             self.pos[self.selected_node] = (event.x, event.y)
             # Chain effect: relax graph while keeping selected node fixed
             self.relax_graph(fixed_nodes={self.selected_node}, iterations=5)
             self.draw_graph()
 
     def on_canvas_release(self, event):
-        pass
+        if self._dragging:
+            self._dragging = False
+            self.update_layout_metrics()
 
     def get_node_at(self, x, y):
         for node, (nx, ny) in self.pos.items():
@@ -229,33 +288,18 @@ class GraphEditor(tk.Frame):
     def draw_graph(self):
         self.canvas.delete("all")
         
+        geometry = self.scene.edge_geometry(self.graph, self.pos)
+        
         # Draw edges
-        for u, v, data in self.graph.edges(data=True):
-            if u not in self.pos or v not in self.pos: continue
-            
-            x1, y1 = self.pos[u]
-            x2, y2 = self.pos[v]
-            
+        for u, v, data, points, arrows, mid in geometry:
             color = data.get('color', 'black')
             
             # Draw line
-            self.canvas.create_line(x1, y1, x2, y2, fill=color, width=2)
-            
-            # Draw arrow (if directed)
-            # Calculate intersection with node circle
-            angle = math.atan2(y2 - y1, x2 - x1)
-            end_x = x2 - self.node_radius * math.cos(angle)
-            end_y = y2 - self.node_radius * math.sin(angle)
+            self.canvas.create_line(*points, fill=color, width=2)
             
-            arrow_points = calculate_arrow_points(x1, y1, end_x, end_y)
-            self.canvas.create_polygon(arrow_points[2:], fill=color)
-            
-            # Draw label
-            mid_x = (x1 + x2) / 2
-            mid_y = (y1 + y2) / 2
-            label = data.get('label', '')
-            if label:
-                self.canvas.create_text(mid_x, mid_y - 10, text=label, fill="black", font=("Arial", 12, "bold"))
+            # Draw arrows (none for undirected links, two for bidirectional ones)
+            for arrow_points in arrows:
+                self.canvas.create_polygon(arrow_points, fill=color)
             
             # Weight is stored but not displayed as per request
 
@@ -263,7 +307,6 @@ class GraphEditor(tk.Frame):
         for node in self.graph.nodes:
             x, y = self.pos[node]
             color = self.graph.nodes[node].get('color', 'white')
-            label = self.graph.nodes[node].get('label', str(node))
             
             # Draw circle
             self.canvas.create_oval(
@@ -272,13 +315,45 @@ class GraphEditor(tk.Frame):
                 fill=color, outline="black", width=2
             )
             
-            # Draw label
-            self.canvas.create_text(x, y, text=label)
+        # Draw labels on top of everything
+        for key, text, font, x, y in self.scene.layout_labels(self.graph, self.pos, geometry):
+            self.canvas.create_text(x, y, text=text, fill="black", font=font)
+            
+        self.update_layout_metrics()
+
+    def get_layout_edges(self):
+        return layout_edges(self.graph, self.pixels_per_unit)
+
+    def get_target_distances(self):
+        return target_distances(self.graph, self.pixels_per_unit)
+
+    def update_layout_metrics(self):
+        edges = self.get_layout_edges()
+        if edges != self._metrics_edges:
+            # Graph or scale changed: start over
+            self._metrics_edges = edges
+            self.layout_metrics.reset(self.pos, edges, self.get_target_distances())
+            summary = self.layout_metrics.summary()
+        else:
+            self.layout_metrics.update(self.pos)
+            summary = self.layout_metrics.summary(refresh_stress=not self._dragging)
+            
+        if not edges:
+            self.lbl_metrics.config(text="")
+            return
+        text = f"Crossings: {summary['crossings']}"
+        if summary['stress'] is not None:
+            if summary['stress_stale']:
+                text += "\nStress: updated on release"
+            else:
+                text += f"\nStress: {summary['stress']:.2f}"
+            text += f"\nLength error: {summary['mean_length_error']:.1%} avg, {summary['max_length_error']:.1%} max"
+        self.lbl_metrics.config(text=text)
 
-    def relax_graph(self, fixed_nodes=None, iterations=10):
+    def relax_graph(self, fixed_nodes=None, iterations=10, alpha=0.5):
         """
-        Custom constraint-based relaxation to enforce edge lengths (weights).
-        Acts like a physical chain.
+        Relaxes self.pos towards the edge weights (see relax_positions),
+        keeping fixed_nodes where they are.
         """
         if not self.graph.edges:
             return
@@ -294,75 +369,67 @@ class GraphEditor(tk.Frame):
         width = self.canvas.winfo_width()
         height = self.canvas.winfo_height()
         
-        for _ in range(iterations):
-            # 1. Edge constraints (Springs)
-            for u, v, data in self.graph.edges(data=True):
-                if u not in self.pos or v not in self.pos: continue
-                
-                x1, y1 = self.pos[u]
-                x2, y2 = self.pos[v]
-                
-                weight = data.get('weight', 1.0)
-                target_dist = weight * self.pixels_per_unit
-                
-                curr_dist = point_distance(x1, y1, x2, y2)
-                if curr_dist == 0: curr_dist = 0.1 # Avoid division by zero
-                
-                # Calculate displacement to match target distance
-                # We want to move nodes closer or further to match target_dist
-                diff = (curr_dist - target_dist) / curr_dist
-                
-                # Move factor (stiffness)
-                alpha = 0.5
-                
-                dx = (x2 - x1) * diff * alpha
-                dy = (y2 - y1) * diff * alpha
-                
-                if u not in fixed_nodes:
-                    self.pos[u] = (x1 + dx, y1 + dy)
-                if v not in fixed_nodes:
-                    self.pos[v] = (x2 - dx, y2 - dy)
-                    
-            # 2. Node repulsion (prevent overlap) - simplified
-            # This is O(N^2), might be slow for large graphs but fine for small ones
-            nodes = list(self.graph.nodes)
-            for i in range(len(nodes)):
-                u = nodes[i]
-                for j in range(i + 1, len(nodes)):
-                    v = nodes[j]
-                    if u == v: continue
-                    
-                    x1, y1 = self.pos[u]
-                    x2, y2 = self.pos[v]
-                    dist = point_distance(x1, y1, x2, y2)
-                    min_dist = self.node_radius * 2.5 # Minimum distance between centers
-                    
-                    if dist < min_dist:
-                        if dist == 0: dist = 0.1
-                        # Push apart
-                        push = (min_dist - dist) / dist * 0.5
-                        dx = (x2 - x1) * push
-                        dy = (y2 - y1) * push
-                        
-                        if u not in fixed_nodes:
-                            self.pos[u] = (x1 - dx, y1 - dy)
-                        if v not in fixed_nodes:
-                            self.pos[v] = (x2 + dx, y2 + dy)
-                            
-            # 3. Keep within bounds (optional, but good)
-            margin = self.node_radius
-            for node in self.graph.nodes:
-                if node in fixed_nodes: continue
-                x, y = self.pos[node]
-                x = max(margin, min(width - margin, x))
-                y = max(margin, min(height - margin, y))
-                self.pos[node] = (x, y)
+        relax_positions(self.pos, list(self.graph.nodes), self.get_layout_edges(), width, height,
+                        self.node_radius, iterations, alpha, fixed_nodes)
 
     def auto_layout(self):
         # Trigger a full relaxation
         self.relax_graph(iterations=100)
         self.draw_graph()
             
+    def best_of_n_layout(self, n=None):
+        """
+        Runs n seeds times the configured alphas and iteration budgets in a process
+        pool and applies the layout with the best sweep_metric. The sweep runs in
+        the background; the window stays responsive until the result comes in.
+        """
+        if not self.graph.edges or self.pixels_per_unit is None:
+            return
+        if n is None:
+            n = simpledialog.askinteger("Best-of-N Layout", "Number of seeds (each tried with every stiffness and iteration budget):", initialvalue=8, minvalue=1)
+            if n is None: return
+            
+        width = self.canvas.winfo_width()
+        height = self.canvas.winfo_height()
+        if width < 100: width = 800
+        if height < 100: height = 600
+        
+        runs = n * len(self.sweep_alphas) * len(self.sweep_iterations)
+        self.lbl_info.config(text=f"Running {runs} layouts...")
+        self.btn_best_layout.config(state=tk.DISABLED)
+        
+        base_seed = random.randrange(2**31)
+        nodes = list(self.graph.nodes)
+        edges = self.get_layout_edges()
+        future = self._sweep_executor.submit(
+            sweep_layouts, nodes, edges, width, height, self.node_radius,
+            seeds=range(base_seed, base_seed + n), alphas=self.sweep_alphas,
+            iterations=self.sweep_iterations, metric=self.sweep_metric,
+            distances=self.get_target_distances()
+        )
+        self.after(100, self._poll_sweep, future, set(nodes), edges)
+        
+    def _poll_sweep(self, future, nodes, edges):
+        if not future.done():
+            self.after(100, self._poll_sweep, future, nodes, edges)
+            return
+            
+        self.btn_best_layout.config(state=tk.NORMAL)
+        try:
+            best_pos, best_score, results = future.result()
+        except Exception as e:
+            self.lbl_info.config(text=f"Layout sweep failed: {e}")
+            return
+            
+        # The graph (nodes, edges, weights or scale) may have been edited while the sweep was running
+        if set(self.graph.nodes) != nodes or self.get_layout_edges() != edges:
+            self.lbl_info.config(text="Graph changed, sweep result dropped")
+            return
+            
+        self.pos.update(best_pos)
+        self.lbl_info.config(text=f"Best {self.sweep_metric}: {best_score:.2f} of {len(results)} runs")
+        self.draw_graph()
+            
     def update_properties_panel(self, node=None, edge=None):
         if node is not None:
             self.lbl_info.config(text=f"Node: {self.graph.nodes[node].get('label')}")
@@ -419,54 +486,50 @@ class GraphEditor(tk.Frame):
             image = Image.new("RGB", (width, height), "white")
             draw = ImageDraw.Draw(image)
             
-            # Offset function
-            def to_img_coords(x, y):
-                return (x - min_x, y - min_y)
-            
-            # Draw edges
-            for u, v, data in self.graph.edges(data=True):
-                x1, y1 = self.pos[u]
-                x2, y2 = self.pos[v]
-                ix1, iy1 = to_img_coords(x1, y1)
-                ix2, iy2 = to_img_coords(x2, y2)
-                
-                color = data.get('color', 'black')
-                draw.line((ix1, iy1, ix2, iy2), fill=color, width=2)
-                
-                # Draw arrow (simplified for PIL)
-                angle = math.atan2(y2 - y1, x2 - x1)
-                end_x = x2 - self.node_radius * math.cos(angle)
-                end_y = y2 - self.node_radius * math.sin(angle)
-                
-                # Calculate arrow points in image coordinates
-                # We need to map the arrow points from graph coords to image coords
-                # First get arrow points in graph coords
-                ap = calculate_arrow_points(x1, y1, end_x, end_y)
-                # ap is [x2, y2, p1_x, p1_y, p2_x, p2_y] (actually the first point is the tip)
-                # Wait, calculate_arrow_points returns [x2, y2, p1_x, p1_y, p2_x, p2_y] where (x2,y2) is the tip.
-                
-                # Map to image coords
-                tip_x, tip_y = to_img_coords(ap[0], ap[1])
-                p1_x, p1_y = to_img_coords(ap[2], ap[3])
-                p2_x, p2_y = to_img_coords(ap[4], ap[5])
-                
-                draw.polygon([(tip_x, tip_y), (p1_x, p1_y), (p2_x, p2_y)], fill=color)
-
-            # Draw nodes
-            for node in self.graph.nodes:
-                x, y = self.pos[node]
-                ix, iy = to_img_coords(x, y)
-                r = self.node_radius
-                color = self.graph.nodes[node].get('color', 'lightblue')
-                
-                draw.ellipse((ix - r, iy - r, ix + r, iy + r), fill=color, outline="black")
-                
-                # Text (requires font loading, skipping for basic implementation or using default)
-                # draw.text(...)
+            # Same edges, nodes and label placements as the canvas
+            draw_items(draw, self.export_scene.scene_items(self.graph, self.pos), origin=(min_x, min_y))
 
             image.save(file_path)
             print(f"Exported to {file_path}")
 
+    def export_animation(self):
+        file_path = filedialog.asksaveasfilename(defaultextension=".gif", filetypes=[("GIF animation", "*.gif"), ("PNG sequence", "*.png")])
+        if not file_path:
+            return
+        iterations = simpledialog.askinteger("Export Animation", "Relaxation iterations:", initialvalue=100, minvalue=1)
+        if iterations is None: return
+        every = simpledialog.askinteger("Export Animation", "Record a frame every K iterations:", initialvalue=2, minvalue=1)
+        if every is None: return
+        
+        self.lbl_info.config(text="Recording animation...")
+        self.update_idletasks()
+        frames = self.record_relaxation(file_path, iterations, every)
+        self.lbl_info.config(text=f"Exported {frames} frames")
+        
+    def record_relaxation(self, file_path, iterations=100, every=2, duration=100):
+        """
+        Streams the relaxation of the current graph to file_path (see
+        image_export.record_relaxation) and applies the final layout to the editor.
+        Returns the number of frames written.
+        """
+        if not self.graph.edges or self.pixels_per_unit is None:
+            return 0
+            
+        # Relaxation keeps nodes inside the canvas, so the canvas is the frame
+        width = self.canvas.winfo_width()
+        height = self.canvas.winfo_height()
+        if width < 100: width = 800
+        if height < 100: height = 600
+        
+        pos = dict(self.pos)
+        frames = record_relaxation(self.graph, pos, file_path, width, height, self.pixels_per_unit,
+                                   self.export_scene, iterations, every, duration)
+            
+        self.pos.update(pos)
+        self.draw_graph()
+        print(f"Exported {frames} frames to {file_path}")
+        return frames
+
     def open_bulk_input(self):
         from bulk_input import BulkGraphDialog
         BulkGraphDialog(self, self.process_bulk_data)
@@ -0,0 +1,160 @@
+import os
+
+from PIL import Image, ImageDraw, GifImagePlugin
+
+from scene import Scene, layout_edges
+from relaxation import relax_positions
+
+# Scene items are (key, kind, coords, options, bbox) tuples:
+#   kind "line"    coords = flat point list, options = {"fill", "width"}
+#   kind "polygon" coords = flat point list, options = {"fill"}
+#   kind "ellipse" coords = (x0, y0, x1, y1), options = {"fill", "outline", "width"}
+#   kind "text"    coords = (x, y) top left, options = {"text", "fill", "font"} (font is a PIL font)
+# Items are drawn in list order; bbox is what the item may paint, used to find dirty regions.
+
+def bbox_overlap(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+def draw_items(draw, items, origin=(0, 0), region=None):
+    """Draws scene items shifted by -origin. With region, only items touching it are drawn."""
+    ox, oy = origin
+    for key, kind, coords, options, bbox in items:
+        if region is not None and not bbox_overlap(bbox, region):
+            continue
+        shifted = [c - (ox if i % 2 == 0 else oy) for i, c in enumerate(coords)]
+        if kind == "line":
+            draw.line(shifted, fill=options["fill"], width=options["width"])
+        elif kind == "polygon":
+            draw.polygon(shifted, fill=options["fill"])
+        elif kind == "ellipse":
+            draw.ellipse(shifted, fill=options["fill"], outline=options["outline"], width=options["width"])
+        elif kind == "text":
+            draw.text(shifted, options["text"], fill=options["fill"], font=options["font"])
+
+class AnimationWriter:
+    """
+    Streams frames of a fixed size to disk, keeping only the latest frame in memory.
+
+    Each frame starts from the previous one; only the region covered by items
+    that appeared, changed or vanished is cleared and redrawn. Frames identical
+    to the previous one are dropped.
+    """
+    def __init__(self, size, background="white"):
+        self.size = size
+        self.background = background
+        self.frame = None
+        self.items = {}
+        self.frame_count = 0
+
+    def add_frame(self, items):
+        current = {item[0]: item for item in items}
+
+        if self.frame is None:
+            self.frame = Image.new("RGB", self.size, self.background)
+            draw_items(ImageDraw.Draw(self.frame), items)
+            region = (0, 0) + self.size
+        else:
+            # A changed item dirties both where it was and where it is now
+            dirty = []
+            for key, item in current.items():
+                old = self.items.get(key)
+                if old != item:
+                    dirty.append(item[4])
+                    if old is not None:
+                        dirty.append(old[4])
+            dirty += [item[4] for key, item in self.items.items() if key not in current]
+            if not dirty:
+                return
+
+            # Union of the dirty boxes, clipped to the frame, in whole pixels
+            x0 = max(0, int(min(b[0] for b in dirty)))
+            y0 = max(0, int(min(b[1] for b in dirty)))
+            x1 = min(self.size[0], int(max(b[2] for b in dirty)) + 1)
+            y1 = min(self.size[1], int(max(b[3] for b in dirty)) + 1)
+            if x0 >= x1 or y0 >= y1:
+                self.items = current
+                return
+            region = (x0, y0, x1, y1)
+
+            patch = Image.new("RGB", (x1 - x0, y1 - y0), self.background)
+            draw_items(ImageDraw.Draw(patch), items, origin=(x0, y0), region=region)
+            self.frame.paste(patch, (x0, y0))
+
+        self.items = current
+        self._write(region)
+        self.frame_count += 1
+
+    def _write(self, region):
+        """Called after each new frame with the redrawn region (x0, y0, x1, y1); subclasses write it out."""
+        pass
+
+    def close(self):
+        pass
+
+class PngSequenceWriter(AnimationWriter):
+    """Writes every frame as a numbered PNG next to path (out.png -> out_00000.png, ...)."""
+    def __init__(self, path, size, background="white"):
+        super().__init__(size, background)
+        self.base, self.ext = os.path.splitext(path)
+        if not self.ext:
+            self.ext = ".png"
+
+    def _write(self, region):
+        self.frame.save(f"{self.base}_{self.frame_count:05d}{self.ext}")
+
+class GifWriter(AnimationWriter):
+    """
+    Encodes an animated GIF frame by frame. After the first frame only the
+    redrawn region is encoded, as a sub-image placed over the previous frame.
+    """
+    def __init__(self, path, size, duration=100, loop=0, background="white"):
+        super().__init__(size, background)
+        self.duration = duration
+        self.loop = loop
+        self.fp = open(path, "wb")
+
+    def _write(self, region):
+        # Pillow only offers whole-sequence GIF saving, so frames are written
+        # through GifImagePlugin's header/frame helpers instead
+        image = self.frame.crop(region).convert("P", palette=Image.ADAPTIVE)
+        if self.frame_count == 0:
+            header, _ = GifImagePlugin.getheader(image, info={"loop": self.loop})
+            for block in header:
+                self.fp.write(block)
+            data = GifImagePlugin.getdata(image, duration=self.duration)
+        else:
+            data = GifImagePlugin.getdata(image, offset=region[:2], duration=self.duration, include_color_table=True)
+        for block in data:
+            self.fp.write(block)
+
+    def close(self):
+        self.fp.write(b";") # GIF trailer
+        self.fp.close()
+
+def record_relaxation(graph, pos, file_path, width, height, pixels_per_unit, scene=None,
+                      iterations=100, every=2, duration=100):
+    """
+    Runs the weight-constrained relaxation on pos (in place) and streams a frame
+    every `every` iterations to file_path: an animated GIF for .gif, otherwise a
+    numbered PNG sequence. Needs no display; frames are drawn at width x height,
+    the area the relaxation keeps nodes in. Returns the number of frames written.
+    """
+    if scene is None:
+        scene = Scene()
+
+    if file_path.lower().endswith(".gif"):
+        writer = GifWriter(file_path, (width, height), duration=duration)
+    else:
+        writer = PngSequenceWriter(file_path, (width, height))
+
+    def record(iteration, pos):
+        if (iteration + 1) % every == 0 or iteration == iterations - 1:
+            writer.add_frame(scene.scene_items(graph, pos))
+
+    try:
+        writer.add_frame(scene.scene_items(graph, pos))
+        relax_positions(pos, list(graph.nodes), layout_edges(graph, pixels_per_unit), width, height,
+                        scene.node_radius, iterations, on_iteration=record)
+    finally:
+        writer.close()
+    return writer.frame_count
@@ -0,0 +1,228 @@
+import heapq
+
+def rects_overlap(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+def rect_union(a, b):
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+class TextMetricsCache:
+    """
+    Caches text extents per (text, font) pair.
+    measure is a callable (text, font) -> (width, height); measuring through Tk
+    is slow, so each pair is only measured once.
+    """
+    def __init__(self, measure):
+        self.measure = measure
+        self._extents = {}
+
+    def extent(self, text, font):
+        key = (text, font)
+        extent = self._extents.get(key)
+        if extent is None:
+            extent = self.measure(text, font)
+            self._extents[key] = extent
+        return extent
+
+class GridIndex:
+    """Uniform grid spatial index over axis-aligned rectangles (x0, y0, x1, y1)."""
+    def __init__(self, cell_size=50):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.rects = {}
+
+    def _cells(self, rect):
+        s = self.cell_size
+        for cx in range(int(rect[0] // s), int(rect[2] // s) + 1):
+            for cy in range(int(rect[1] // s), int(rect[3] // s) + 1):
+                yield (cx, cy)
+
+    def insert(self, key, rect):
+        if key in self.rects:
+            self.remove(key)
+        self.rects[key] = rect
+        for cell in self._cells(rect):
+            self.cells.setdefault(cell, set()).add(key)
+
+    def remove(self, key):
+        rect = self.rects.pop(key, None)
+        if rect is None:
+            return
+        for cell in self._cells(rect):
+            bucket = self.cells.get(cell)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self.cells[cell]
+
+    def query(self, rect):
+        """Returns the keys of all rectangles overlapping rect."""
+        found = set()
+        for cell in self._cells(rect):
+            for key in self.cells.get(cell, ()):
+                if key not in found and rects_overlap(self.rects[key], rect):
+                    found.add(key)
+        return found
+
+class LabelLayout:
+    """
+    Collision-free placement of node and edge labels.
+
+    Labels are (key, text, font, x, y, priority, kind) tuples where (x, y) is the
+    anchor and kind is "node" (centered on the anchor) or "edge" (tried at a few
+    offsets around the anchor). Obstacles (node circles) block edge labels only.
+    Higher priority labels win; labels that don't fit anywhere are hidden.
+
+    update() is incremental: only labels whose input changed, plus the labels
+    around them, are placed again. Everything else keeps its previous spot.
+    """
+    def __init__(self, metrics, cell_size=50, padding=2, edge_offset=10):
+        self.metrics = metrics
+        self.padding = padding
+        self.edge_offset = edge_offset
+
+        self.specs = {} # key -> (text, font, x, y, priority, kind)
+        self.order = {} # key -> input position, keeps ties stable
+        self.boxes = {} # key -> placed rect, only for visible labels
+        self.obstacles = {} # key -> rect
+        self._previous = {} # key -> box held before the running update, while it is re-placed
+
+        self._labels = GridIndex(cell_size)
+        self._hidden = GridIndex(cell_size) # Reach of hidden labels, to retry them when space frees up
+        self._obstacles = GridIndex(cell_size)
+
+    def _candidates(self, spec):
+        text, font, x, y, priority, kind = spec
+        w, h = self.metrics.extent(text, font)
+        w += 2 * self.padding
+        h += 2 * self.padding
+
+        if kind == "node":
+            centers = [(x, y)]
+        else:
+            d = self.edge_offset
+            # Above first, like the original fixed placement, then below, right, left, further out
+            centers = [(x, y - d), (x, y + d), (x + d + w / 2, y), (x - d - w / 2, y),
+                       (x, y - 2 * d - h / 2), (x, y + 2 * d + h / 2)]
+        return [(cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2) for cx, cy in centers]
+
+    def _reach(self, spec):
+        candidates = self._candidates(spec)
+        reach = candidates[0]
+        for rect in candidates[1:]:
+            reach = rect_union(reach, rect)
+        return reach
+
+    def _blocked(self, rect, kind):
+        if kind != "node" and self._obstacles.query(rect):
+            return True
+        return bool(self._labels.query(rect))
+
+    def _hide(self, key):
+        self._labels.remove(key)
+        self.boxes.pop(key, None)
+        self._hidden.remove(key)
+
+    def _place(self, key, queue):
+        self._try_place(key, queue)
+
+        # Moving away from (or losing) the previous spot frees it for hidden labels
+        previous = self._previous.pop(key, None)
+        if previous is not None and self.boxes.get(key) != previous:
+            for other in self._hidden.query(previous):
+                heapq.heappush(queue, (-self.specs[other][4], self.order[other], other))
+
+    def _try_place(self, key, queue):
+        spec = self.specs[key]
+        kind = spec[5]
+        candidates = self._candidates(spec)
+
+        for rect in candidates:
+            if not self._blocked(rect, kind):
+                self.boxes[key] = rect
+                self._labels.insert(key, rect)
+                return
+
+        # No free spot: evict strictly lower priority labels from the preferred one
+        rect = candidates[0]
+        blockers = self._labels.query(rect)
+        if (kind == "node" or not self._obstacles.query(rect)) and \
+                all(self.specs[b][4] < spec[4] for b in blockers):
+            for b in blockers:
+                self._previous.setdefault(b, self.boxes[b])
+                self._hide(b)
+                heapq.heappush(queue, (-self.specs[b][4], self.order[b], b))
+            self.boxes[key] = rect
+            self._labels.insert(key, rect)
+            return
+
+        self._hidden.insert(key, self._reach(spec))
+
+    def update(self, labels, obstacles):
+        """Re-places labels affected by changes since the last call. Returns the visible labels."""
+        dirty = set()
+        dirty_rects = []
+
+        # Obstacles that appeared, moved or vanished
+        for key, rect in obstacles.items():
+            old = self.obstacles.get(key)
+            if old != rect:
+                dirty_rects.append(rect)
+                if old is not None:
+                    dirty_rects.append(old)
+                    self._obstacles.remove(key)
+                self._obstacles.insert(key, rect)
+        for key in list(self.obstacles):
+            if key not in obstacles:
+                dirty_rects.append(self.obstacles[key])
+                self._obstacles.remove(key)
+        self.obstacles = dict(obstacles)
+
+        # Labels that appeared, moved, changed or vanished
+        seen = set()
+        for i, (key, text, font, x, y, priority, kind) in enumerate(labels):
+            spec = (text, font, x, y, priority, kind)
+            seen.add(key)
+            self.order[key] = i
+            if self.specs.get(key) != spec:
+                if key in self.boxes:
+                    dirty_rects.append(self.boxes[key])
+                self._hide(key)
+                self.specs[key] = spec
+                dirty.add(key)
+                dirty_rects.append(self._reach(spec))
+        for key in list(self.specs):
+            if key not in seen:
+                if key in self.boxes:
+                    dirty_rects.append(self.boxes[key])
+                self._hide(key)
+                del self.specs[key]
+                del self.order[key]
+
+        # Neighbours of the changed area get a chance to move or reappear
+        for rect in dirty_rects:
+            dirty |= self._labels.query(rect)
+            dirty |= self._hidden.query(rect)
+
+        queue = []
+        for key in dirty:
+            if key in self.boxes:
+                self._previous[key] = self.boxes[key]
+            self._hide(key)
+            heapq.heappush(queue, (-self.specs[key][4], self.order[key], key))
+        while queue:
+            _, _, key = heapq.heappop(queue)
+            if key in self.boxes:
+                continue
+            self._place(key, queue)
+        self._previous.clear()
+
+        return self.visible()
+
+    def visible(self):
+        """Returns (key, text, font, x, y) for every shown label, x/y being the text center."""
+        result = []
+        for key, rect in self.boxes.items():
+            text, font = self.specs[key][:2]
+            result.append((key, text, font, (rect[0] + rect[2]) / 2, (rect[1] + rect[3]) / 2))
+        return result
@@ -0,0 +1,175 @@
+from utils import point_distance
+
+def _orientation(ax, ay, bx, by, cx, cy):
+    cross = (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+    return (cross > 0) - (cross < 0)
+
+def segments_cross(p1, p2, p3, p4):
+    """True if segment p1-p2 properly crosses segment p3-p4 (touching or collinear doesn't count)."""
+    o1 = _orientation(*p1, *p2, *p3)
+    o2 = _orientation(*p1, *p2, *p4)
+    o3 = _orientation(*p3, *p4, *p1)
+    o4 = _orientation(*p3, *p4, *p2)
+    return o1 * o2 < 0 and o3 * o4 < 0
+
+class LayoutMetrics:
+    """
+    Layout quality numbers kept up to date as nodes move.
+
+    - crossings: number of crossing edge pairs, found through a grid of edge buckets
+    - stress: sum over node pairs of ((d - D) / D)^2, D being the target (shortest path) distance
+    - length errors: |length - target| / target for every edge
+
+    reset() takes the edges as (u, v, target_length) tuples and, optionally, the
+    target pixel distances between node pairs for stress. update() only revisits
+    edges touching nodes that moved at least move_threshold pixels; smaller
+    moves are ignored until they add up.
+
+    Stress is O(N) per moved node. When more than stress_fraction of the nodes
+    moved (a relaxation step during a drag moves nearly all of them), stress is
+    marked stale instead and recomputed by the next summary() call, so callers
+    that update often can ask for summary(refresh_stress=False) until they're done.
+    """
+    def __init__(self, cell_size=100, move_threshold=1.0, stress_fraction=0.25):
+        self.cell_size = cell_size
+        self.move_threshold = move_threshold
+        self.stress_fraction = stress_fraction
+        self.reset({}, [])
+
+    def reset(self, pos, edges, distances=None):
+        self.pos = {}
+        self.edges = list(edges)
+        self.distances = distances
+
+        self.incident = {} # node -> edge indices
+        for i, (u, v, target) in enumerate(self.edges):
+            self.incident.setdefault(u, []).append(i)
+            self.incident.setdefault(v, []).append(i)
+
+        self.cells = {} # cell -> edge indices
+        self.edge_cells = {} # edge index -> cells
+        self.crossing_with = {} # edge index -> indices of the edges it crosses
+        self.crossings = 0
+        self.length_errors = {}
+        self.stress = 0.0 if distances is not None else None
+        self.stress_stale = False
+
+        self.update(pos)
+
+    def _cells_for(self, i):
+        u, v, _ = self.edges[i]
+        (x1, y1), (x2, y2) = self.pos[u], self.pos[v]
+        s = self.cell_size
+        cells = []
+        for cx in range(int(min(x1, x2) // s), int(max(x1, x2) // s) + 1):
+            for cy in range(int(min(y1, y2) // s), int(max(y1, y2) // s) + 1):
+                cells.append((cx, cy))
+        return cells
+
+    def _unbucket(self, i):
+        for cell in self.edge_cells.pop(i, ()):
+            bucket = self.cells[cell]
+            bucket.discard(i)
+            if not bucket:
+                del self.cells[cell]
+        for j in self.crossing_with.pop(i, ()):
+            self.crossing_with[j].discard(i)
+            self.crossings -= 1
+        self.length_errors.pop(i, None)
+
+    def _bucket(self, i):
+        u, v, target = self.edges[i]
+        candidates = set()
+        cells = self._cells_for(i)
+        for cell in cells:
+            candidates |= self.cells.get(cell, set())
+            self.cells.setdefault(cell, set()).add(i)
+        self.edge_cells[i] = cells
+
+        crossed = set()
+        for j in candidates:
+            a, b, _ = self.edges[j]
+            if a in (u, v) or b in (u, v): continue # Adjacent edges can't cross
+            if segments_cross(self.pos[u], self.pos[v], self.pos[a], self.pos[b]):
+                crossed.add(j)
+                self.crossing_with[j].add(i)
+        self.crossing_with[i] = crossed
+        self.crossings += len(crossed)
+
+        if target > 0:
+            length = point_distance(*self.pos[u], *self.pos[v])
+            self.length_errors[i] = abs(length - target) / target
+
+    def _pair_stress(self, u, v, pos):
+        target = self.distances.get(u, {}).get(v)
+        if not target or u not in pos or v not in pos:
+            return 0.0
+        d = point_distance(*pos[u], *pos[v])
+        return ((d - target) / target) ** 2
+
+    def update(self, pos):
+        """Refreshes the metrics for the nodes that moved since they were last accounted for."""
+        moved = [n for n in pos if n not in self.pos
+                 or point_distance(*self.pos[n], *pos[n]) >= self.move_threshold]
+        moved += [n for n in self.pos if n not in pos]
+        if not moved:
+            return self.summary(refresh_stress=False)
+
+        # Nodes below the threshold keep the position the metrics were computed with
+        old_pos = self.pos
+        new_pos = {n: old_pos.get(n, pos[n]) for n in pos}
+        for n in moved:
+            if n in pos:
+                new_pos[n] = pos[n]
+
+        if self.stress is not None and old_pos and len(moved) > self.stress_fraction * len(new_pos):
+            self.stress_stale = True
+        elif self.stress is not None and not self.stress_stale:
+            # Only pairs with a moved node change; count pairs of two moved nodes once
+            rank = {node: k for k, node in enumerate(moved)}
+            nodes = set(old_pos) | set(new_pos)
+            for k, u in enumerate(moved):
+                for v in nodes:
+                    if v == u or rank.get(v, len(moved)) < k: continue
+                    self.stress += self._pair_stress(u, v, new_pos) - self._pair_stress(u, v, old_pos)
+
+        touched = set()
+        for node in moved:
+            touched.update(self.incident.get(node, ()))
+
+        self.pos = new_pos
+        for i in touched:
+            self._unbucket(i)
+        for i in touched:
+            u, v, _ = self.edges[i]
+            if u in new_pos and v in new_pos:
+                self._bucket(i)
+
+        return self.summary(refresh_stress=False)
+
+    def refresh_stress(self):
+        """Recomputes stress over all node pairs at the accounted positions."""
+        nodes = list(self.pos)
+        self.stress = 0.0
+        for k, u in enumerate(nodes):
+            for v in nodes[k + 1:]:
+                self.stress += self._pair_stress(u, v, self.pos)
+        self.stress_stale = False
+
+    def summary(self, refresh_stress=True):
+        if refresh_stress and self.stress_stale:
+            self.refresh_stress()
+        errors = list(self.length_errors.values())
+        return {
+            "crossings": self.crossings,
+            "stress": self.stress,
+            "stress_stale": self.stress_stale,
+            "mean_length_error": sum(errors) / len(errors) if errors else 0.0,
+            "max_length_error": max(errors) if errors else 0.0,
+        }
+
+def evaluate_layout(pos, edges, distances=None):
+    """One-off metrics for a finished layout, e.g. to reject bad layouts in batch jobs."""
+    metrics = LayoutMetrics()
+    metrics.reset(pos, edges, distances)
+    return metrics.summary()
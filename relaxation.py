@@ -0,0 +1,140 @@
+import itertools
+import multiprocessing
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from utils import point_distance
+from layout_metrics import evaluate_layout
+
+def relax_positions(pos, nodes, edges, width, height, node_radius=20, iterations=10, alpha=0.5, fixed_nodes=(),
+                    on_iteration=None):
+    """
+    Custom constraint-based relaxation to enforce edge lengths (weights).
+    Acts like a physical chain. Updates pos in place.
+
+    edges are (u, v, target_length) tuples, alpha is the spring stiffness.
+    on_iteration, if given, is called as on_iteration(i, pos) after every iteration.
+    """
+    for iteration in range(iterations):
+        # 1. Edge constraints (Springs)
+        for u, v, target_dist in edges:
+            if u not in pos or v not in pos: continue
+
+            x1, y1 = pos[u]
+            x2, y2 = pos[v]
+
+            curr_dist = point_distance(x1, y1, x2, y2)
+            if curr_dist == 0: curr_dist = 0.1 # Avoid division by zero
+
+            # Calculate displacement to match target distance
+            # We want to move nodes closer or further to match target_dist
+            diff = (curr_dist - target_dist) / curr_dist
+
+            dx = (x2 - x1) * diff * alpha
+            dy = (y2 - y1) * diff * alpha
+
+            if u not in fixed_nodes:
+                pos[u] = (x1 + dx, y1 + dy)
+            if v not in fixed_nodes:
+                pos[v] = (x2 - dx, y2 - dy)
+
+        # 2. Node repulsion (prevent overlap) - simplified
+        # This is O(N^2), might be slow for large graphs but fine for small ones
+        for i in range(len(nodes)):
+            u = nodes[i]
+            for j in range(i + 1, len(nodes)):
+                v = nodes[j]
+                if u == v: continue
+
+                x1, y1 = pos[u]
+                x2, y2 = pos[v]
+                dist = point_distance(x1, y1, x2, y2)
+                min_dist = node_radius * 2.5 # Minimum distance between centers
+
+                if dist < min_dist:
+                    if dist == 0: dist = 0.1
+                    # Push apart
+                    push = (min_dist - dist) / dist * 0.5
+                    dx = (x2 - x1) * push
+                    dy = (y2 - y1) * push
+
+                    if u not in fixed_nodes:
+                        pos[u] = (x1 - dx, y1 - dy)
+                    if v not in fixed_nodes:
+                        pos[v] = (x2 + dx, y2 + dy)
+
+        # 3. Keep within bounds (optional, but good)
+        margin = node_radius
+        for node in nodes:
+            if node in fixed_nodes: continue
+            x, y = pos[node]
+            x = max(margin, min(width - margin, x))
+            y = max(margin, min(height - margin, y))
+            pos[node] = (x, y)
+
+        if on_iteration is not None:
+            on_iteration(iteration, pos)
+    return pos
+
+def random_positions(nodes, width, height, seed=None):
+    """Random start positions, like the ones the editor seeds new graphs with."""
+    rng = random.Random(seed)
+    return {node: (rng.randint(50, width - 50), rng.randint(50, height - 50)) for node in nodes}
+
+# Read-only graph shared by every task of a worker, set once per process
+_shared = {}
+
+def _init_worker(nodes, edges, distances, width, height, node_radius, metric):
+    _shared.update(nodes=nodes, edges=edges, distances=distances, width=width,
+                   height=height, node_radius=node_radius, metric=metric)
+
+def score_layout(pos, edges, distances, metric):
+    """Lower is better. metric is a key of evaluate_layout()'s summary or a callable taking that summary."""
+    summary = evaluate_layout(pos, edges, distances)
+    if callable(metric):
+        return metric(summary)
+    return summary[metric]
+
+def _run_layout(params):
+    seed, alpha, iterations = params
+    g = _shared
+    pos = random_positions(g["nodes"], g["width"], g["height"], seed)
+    relax_positions(pos, g["nodes"], g["edges"], g["width"], g["height"], g["node_radius"], iterations, alpha)
+    return params, pos, score_layout(pos, g["edges"], g["distances"], g["metric"])
+
+def sweep_layouts(nodes, edges, width=800, height=600, node_radius=20, seeds=range(8), alphas=(0.3, 0.5, 0.8),
+                  iterations=(50, 100, 200), metric="stress", distances=None, processes=None):
+    """
+    Runs one seeded layout per (seed, alpha, iterations) combination and keeps the best.
+
+    nodes and edges (u, v, target_length) are handed to each worker process once.
+    metric is a key of evaluate_layout()'s summary ("crossings", "stress",
+    "mean_length_error", "max_length_error") or a picklable callable taking the
+    summary; lower scores win. "stress" needs distances (see LayoutMetrics).
+    processes=1 runs everything in the calling process. Workers are spawned,
+    not forked, so the pool is safe to start from a threaded (e.g. Tk) process.
+
+    Returns (best_pos, best_score, results) where results lists
+    ((seed, alpha, iterations), score) for every run.
+    """
+    if metric == "stress" and distances is None:
+        raise ValueError("The stress metric needs target distances")
+
+    nodes = list(nodes)
+    edges = list(edges)
+    combos = list(itertools.product(seeds, alphas, iterations))
+    initargs = (nodes, edges, distances, width, height, node_radius, metric)
+
+    if processes == 1:
+        _init_worker(*initargs)
+        runs = [_run_layout(params) for params in combos]
+    else:
+        with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker, initargs=initargs) as pool:
+            runs = list(pool.map(_run_layout, combos))
+
+    best_pos, best_score = None, None
+    for params, pos, score in runs:
+        if best_score is None or score < best_score:
+            best_pos, best_score = pos, score
+    return best_pos, best_score, [(params, score) for params, pos, score in runs]
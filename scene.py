@@ -0,0 +1,210 @@
+import math
+
+import networkx as nx
+from PIL import ImageFont
+
+from utils import calculate_arrow_points, point_distance, collapse_reciprocal_edges, quadratic_bezier_points
+from label_layout import LabelLayout, TextMetricsCache
+
+_pil_fonts = {}
+
+def get_pil_font(font):
+    """PIL font for a Tk style font tuple (family, size[, style...]), cached per tuple."""
+    pil_font = _pil_fonts.get(font)
+    if pil_font is None:
+        family, size = font[0], font[1]
+        bold = "bold" in font[2:]
+        # Tk sizes are points, PIL sizes are pixels (96 dpi)
+        px = round(size * 96 / 72)
+        candidates = [f"{family.lower()}{'bd' if bold else ''}.ttf",
+                      "DejaVuSans-Bold.ttf" if bold else "DejaVuSans.ttf"]
+        for name in candidates:
+            try:
+                pil_font = ImageFont.truetype(name, px)
+                break
+            except OSError:
+                continue
+        else:
+            pil_font = ImageFont.load_default()
+        _pil_fonts[font] = pil_font
+    return pil_font
+
+def measure_pil_text(text, font):
+    left, top, right, bottom = get_pil_font(font).getbbox(text)
+    return (right - left, bottom - top)
+
+def layout_edges(graph, pixels_per_unit):
+    """
+    Returns (u, v, target_length) tuples, target_length being weight * pixels_per_unit.
+    Reciprocal pairs with equal weights share one spring, whatever the edge view;
+    pairs with different weights keep one spring per direction.
+    """
+    scale = pixels_per_unit or 0
+    springs = []
+    for u, v, data, reciprocal in collapse_reciprocal_edges(graph.edges(data=True)):
+        weight = data.get('weight', 1.0)
+        springs.append((u, v, weight * scale))
+        if reciprocal:
+            reverse_weight = graph.edges[v, u].get('weight', 1.0)
+            if reverse_weight != weight:
+                springs.append((v, u, reverse_weight * scale))
+    return springs
+
+def target_distances(graph, pixels_per_unit):
+    """Shortest path distances in pixels between all node pairs, used for stress."""
+    if not pixels_per_unit:
+        return None
+    lengths = nx.all_pairs_dijkstra_path_length(graph.to_undirected(as_view=True), weight='weight')
+    return {u: {v: d * pixels_per_unit for v, d in targets.items()} for u, targets in lengths}
+
+class Scene:
+    """
+    Turns a graph and node positions into what gets drawn: edge geometry, label
+    placements and image_export scene items. Needs no Tk, so batch jobs can use it.
+
+    measure is the (text, font) -> (width, height) callable labels are placed
+    with; it should match the fonts the output is drawn with (Tk metrics for the
+    canvas, PIL metrics, the default, for images).
+    """
+    def __init__(self, measure=measure_pil_text, node_radius=20, edge_view="DIRECTED", parallel_edge_offset=15,
+                 node_label_font=("Arial", 10), edge_label_font=("Arial", 12, "bold")):
+        self.node_radius = node_radius
+        self.edge_view = edge_view # DIRECTED, UNDIRECTED, BIDIRECTIONAL, PARALLEL
+        self.parallel_edge_offset = parallel_edge_offset # Gap between the two curves of a reciprocal pair
+        self.node_label_font = node_label_font
+        self.edge_label_font = edge_label_font
+        self.label_layout = LabelLayout(TextMetricsCache(measure))
+
+    def render_edges(self, graph):
+        """
+        Returns (u, v, data, reciprocal) tuples for the current edge view.
+        Every view except DIRECTED collapses u->v / v->u pairs into one link.
+        """
+        edges = graph.edges(data=True)
+        if self.edge_view == "DIRECTED":
+            return [(u, v, data, False) for u, v, data in edges]
+        return collapse_reciprocal_edges(edges)
+
+    def edge_geometry(self, graph, pos):
+        """
+        Returns (u, v, data, points, arrows, mid) tuples describing every rendered link.
+        points is a flat line coordinate list, arrows a list of arrowhead triangles
+        ([tip_x, tip_y, p1_x, p1_y, p2_x, p2_y]) and mid the label anchor.
+        A merged pair whose directions differ in label or color is drawn as
+        parallel curves in every view, so neither direction's styling is lost.
+        """
+        geometry = []
+        for u, v, data, reciprocal in self.render_edges(graph):
+            if u not in pos or v not in pos: continue
+
+            x1, y1 = pos[u]
+            x2, y2 = pos[v]
+
+            reverse = graph.edges[v, u] if reciprocal else None
+            if reciprocal and (self.edge_view == "PARALLEL" or self._styled_apart(data, reverse)):
+                # Each direction bends to its own left, so the pair never overlaps
+                geometry.append(self._curved_edge(u, v, data, pos))
+                geometry.append(self._curved_edge(v, u, reverse, pos))
+                continue
+
+            # Undirected links carry no arrowheads at all
+            arrows = []
+            if self.edge_view != "UNDIRECTED":
+                arrows.append(self._arrow_at(x1, y1, x2, y2))
+                if reciprocal and self.edge_view == "BIDIRECTIONAL":
+                    arrows.append(self._arrow_at(x2, y2, x1, y1))
+
+            mid = ((x1 + x2) / 2, (y1 + y2) / 2)
+            geometry.append((u, v, data, [x1, y1, x2, y2], arrows, mid))
+        return geometry
+
+    def _styled_apart(self, data, reverse):
+        return (data.get('label', '') != reverse.get('label', '')
+                or data.get('color', 'black') != reverse.get('color', 'black'))
+
+    def _arrow_at(self, x1, y1, x2, y2):
+        # Arrowhead touching the node circle at (x2, y2), coming from (x1, y1)
+        angle = math.atan2(y2 - y1, x2 - x1)
+        end_x = x2 - self.node_radius * math.cos(angle)
+        end_y = y2 - self.node_radius * math.sin(angle)
+        return calculate_arrow_points(x1, y1, end_x, end_y)
+
+    def _curved_edge(self, u, v, data, pos):
+        x1, y1 = pos[u]
+        x2, y2 = pos[v]
+        length = point_distance(x1, y1, x2, y2)
+        if length == 0: length = 0.1
+
+        # Quadratic Bezier peaks at half the control point offset
+        norm_x, norm_y = (y2 - y1) / length, -(x2 - x1) / length
+        offset = 2 * self.parallel_edge_offset
+        cx = (x1 + x2) / 2 + norm_x * offset
+        cy = (y1 + y2) / 2 + norm_y * offset
+
+        points = quadratic_bezier_points(x1, y1, cx, cy, x2, y2)
+        mid = ((x1 + x2) / 2 + norm_x * self.parallel_edge_offset,
+               (y1 + y2) / 2 + norm_y * self.parallel_edge_offset)
+        return (u, v, data, points, [self._arrow_at(cx, cy, x2, y2)], mid)
+
+    def layout_labels(self, graph, pos, geometry):
+        """
+        Runs the label placement stage.
+        Returns (key, text, font, x, y) for every label to draw, (x, y) being the text center.
+        Node labels outrank edge labels; edge labels that find no free spot are hidden.
+        """
+        r = self.node_radius
+        obstacles = {}
+        labels = []
+        for node in graph.nodes:
+            if node not in pos: continue
+            x, y = pos[node]
+            obstacles[node] = (x - r, y - r, x + r, y + r)
+            label = graph.nodes[node].get('label', str(node))
+            if label:
+                labels.append((("node", node), label, self.node_label_font, x, y, 2, "node"))
+
+        for u, v, data, points, arrows, mid in geometry:
+            label = data.get('label', '')
+            if label:
+                labels.append((("edge", u, v), label, self.edge_label_font, mid[0], mid[1], 1, "edge"))
+
+        return self.label_layout.update(labels, obstacles)
+
+    def scene_items(self, graph, pos):
+        """
+        Returns the picture as scene items for image_export: edges, then nodes,
+        then labels, drawn with PIL fonts. Coordinates are whole pixels so
+        unchanged items compare equal between animation frames.
+        """
+        geometry = self.edge_geometry(graph, pos)
+        items = []
+
+        for u, v, data, points, arrows, mid in geometry:
+            color = data.get('color', 'black')
+            coords = [round(c) for c in points]
+            xs, ys = coords[0::2], coords[1::2]
+            items.append((("edge", u, v), "line", coords, {"fill": color, "width": 2},
+                          (min(xs) - 2, min(ys) - 2, max(xs) + 2, max(ys) + 2)))
+            for k, ap in enumerate(arrows):
+                coords = [round(c) for c in ap]
+                xs, ys = coords[0::2], coords[1::2]
+                items.append((("arrow", u, v, k), "polygon", coords, {"fill": color},
+                              (min(xs) - 1, min(ys) - 1, max(xs) + 1, max(ys) + 1)))
+
+        r = self.node_radius
+        for node in graph.nodes:
+            if node not in pos: continue
+            x, y = round(pos[node][0]), round(pos[node][1])
+            color = graph.nodes[node].get('color', 'white')
+            items.append((("node", node), "ellipse", (x - r, y - r, x + r, y + r),
+                          {"fill": color, "outline": "black", "width": 1},
+                          (x - r - 1, y - r - 1, x + r + 1, y + r + 1)))
+
+        for key, text, font, x, y in self.layout_labels(graph, pos, geometry):
+            pil_font = get_pil_font(font)
+            left, top, right, bottom = pil_font.getbbox(text)
+            tx = round(x - (left + right) / 2)
+            ty = round(y - (top + bottom) / 2)
+            items.append((("label",) + key, "text", (tx, ty), {"text": text, "fill": "black", "font": pil_font},
+                          (tx + left - 1, ty + top - 1, tx + right + 1, ty + bottom + 1)))
+        return items
@@ -0,0 +1,51 @@
+import pytest
+
+pytest.importorskip("PIL")
+pytest.importorskip("networkx") # image_export imports scene
+from PIL import Image, ImageChops, ImageDraw
+
+from image_export import AnimationWriter, PngSequenceWriter, draw_items
+
+def node(name, x, y, r=20):
+    return (("node", name), "ellipse", (x - r, y - r, x + r, y + r),
+            {"fill": "white", "outline": "black", "width": 1},
+            (x - r - 1, y - r - 1, x + r + 1, y + r + 1))
+
+def edge(u, v, coords):
+    xs, ys = coords[0::2], coords[1::2]
+    return (("edge", u, v), "line", coords, {"fill": "black", "width": 2},
+            (min(xs) - 2, min(ys) - 2, max(xs) + 2, max(ys) + 2))
+
+def full_redraw(items, size):
+    image = Image.new("RGB", size, "white")
+    draw_items(ImageDraw.Draw(image), items)
+    return image
+
+def test_moved_item_leaves_no_trail(tmp_path):
+    size = (300, 200)
+    writer = PngSequenceWriter(str(tmp_path / "out.png"), size)
+    writer.add_frame([edge("a", "b", [50, 50, 250, 150]), node("a", 50, 50), node("b", 250, 150)])
+
+    moved = [edge("a", "b", [50, 50, 150, 100]), node("a", 50, 50), node("b", 150, 100)]
+    writer.add_frame(moved)
+
+    assert writer.frame_count == 2
+    assert ImageChops.difference(writer.frame, full_redraw(moved, size)).getbbox() is None
+
+def test_png_sequence_matches_full_redraws(tmp_path):
+    size = (200, 200)
+    frames = [[node("a", 40 + 30 * k, 100)] for k in range(4)]
+    writer = PngSequenceWriter(str(tmp_path / "out.png"), size)
+    for items in frames:
+        writer.add_frame(items)
+    writer.close()
+
+    for k, items in enumerate(frames):
+        with Image.open(tmp_path / f"out_{k:05d}.png") as written:
+            assert ImageChops.difference(written.convert("RGB"), full_redraw(items, size)).getbbox() is None
+
+def test_unchanged_frames_are_dropped():
+    writer = AnimationWriter((100, 100))
+    writer.add_frame([node("a", 50, 50)])
+    writer.add_frame([node("a", 50, 50)])
+    assert writer.frame_count == 1
@@ -0,0 +1,64 @@
+import math
+
+import templates
+from layout_metrics import LayoutMetrics, evaluate_layout
+from relaxation import relax_positions, random_positions
+from utils import collapse_reciprocal_edges
+
+WIDTH, HEIGHT, RADIUS = 800, 600, 20
+
+def usa_layout():
+    topology = templates.usa_topology
+    scale = 150.0 / 800
+    pairs = ((str(u), str(v), w) for u, neighbors in topology.items() for v, w in neighbors.items())
+    edges = [(u, v, w * scale) for u, v, w, _ in collapse_reciprocal_edges(pairs)]
+    nodes = [str(n) for n in topology]
+    # Any positive pair targets will do for checking stress bookkeeping
+    distances = {u: {v: 100.0 * (abs(i - j) + 1) for j, v in enumerate(nodes) if v != u}
+                 for i, u in enumerate(nodes)}
+    pos = random_positions(nodes, WIDTH, HEIGHT, seed=7)
+    relax_positions(pos, nodes, edges, WIDTH, HEIGHT, RADIUS, iterations=100)
+    return nodes, edges, distances, pos
+
+def test_drag_stays_incremental():
+    nodes, edges, distances, pos = usa_layout()
+    metrics = LayoutMetrics()
+    metrics.reset(pos, edges, distances)
+
+    pair_calls = []
+    pair_stress = metrics._pair_stress
+    metrics._pair_stress = lambda u, v, p: pair_calls.append(1) or pair_stress(u, v, p)
+    metrics.reset = lambda *args: (_ for _ in ()).throw(AssertionError("reset during drag"))
+
+    # Same steps as GraphEditor.on_canvas_drag: move one node, relax around it
+    dragged = nodes[8]
+    x, y = pos[dragged]
+    for step in range(50):
+        pos[dragged] = (x + 150 * math.cos(step / 8), y + 100 * math.sin(step / 8))
+        relax_positions(pos, nodes, edges, WIDTH, HEIGHT, RADIUS, iterations=5, fixed_nodes={dragged})
+        summary = metrics.update(pos)
+
+        expected = evaluate_layout(metrics.pos, edges)
+        assert summary["crossings"] == expected["crossings"]
+        assert math.isclose(summary["mean_length_error"], expected["mean_length_error"])
+        assert math.isclose(summary["max_length_error"], expected["max_length_error"])
+
+    # Less than a single full stress pass over all 50 drag events
+    assert len(pair_calls) < len(nodes) * (len(nodes) - 1) / 2
+
+    # Release: stress is brought up to date
+    summary = metrics.summary()
+    assert not summary["stress_stale"]
+    assert math.isclose(summary["stress"], evaluate_layout(metrics.pos, edges, distances)["stress"])
+
+def test_small_moves_update_stress_incrementally():
+    nodes, edges, distances, pos = usa_layout()
+    metrics = LayoutMetrics()
+    metrics.reset(pos, edges, distances)
+
+    for step in range(20):
+        node = nodes[step % len(nodes)]
+        pos[node] = (pos[node][0] + 5, pos[node][1] - 3)
+        summary = metrics.update(pos)
+        assert not summary["stress_stale"]
+        assert math.isclose(summary["stress"], evaluate_layout(metrics.pos, edges, distances)["stress"])
@@ -15,3 +15,33 @@ def calculate_arrow_points(x1, y1, x2, y2, arrow_size=10):
 
 def point_distance(x1, y1, x2, y2):
     return math.sqrt((x2 - x1)**2 + (y2 - y1)**2)
+
+def collapse_reciprocal_edges(edges):
+    """Merges u->v / v->u pairs into one link.
+
+    Takes (u, v, data) tuples and returns (u, v, data, reciprocal) tuples in
+    input order. The first direction seen is kept along with its data.
+    """
+    links = []
+    index = {}
+    for u, v, data in edges:
+        reverse = index.get((v, u))
+        if reverse is not None and u != v:
+            ru, rv, rdata, _ = links[reverse]
+            links[reverse] = (ru, rv, rdata, True)
+            continue
+        index[(u, v)] = len(links)
+        links.append((u, v, data, False))
+    return links
+
+def quadratic_bezier_points(x1, y1, cx, cy, x2, y2, steps=16):
+    """Samples a quadratic Bezier curve from (x1, y1) to (x2, y2) as a flat coordinate list."""
+    points = []
+    for i in range(steps + 1):
+        t = i / steps
+        a = (1 - t) ** 2
+        b = 2 * (1 - t) * t
+        c = t ** 2
+        points.append(a * x1 + b * cx + c * x2)
+        points.append(a * y1 + b * cy + c * y2)
+    return points